@@ -1,7 +1,7 @@
-from pydantic import BaseModel, Field, model_validator, field_validator
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError, model_validator, field_validator
 from typing import Dict, Any, Optional, List, Union
 from datetime import datetime
-import json
+import orjson
 
 
 class ContentItem(BaseModel):
@@ -22,16 +22,34 @@ class ChatRecord(BaseModel):
     chat_data: Optional[ChatDataStructure] = Field(default=None)
     timestamp: Optional[datetime] = Field(default=None)
 
+    _cached_texts: List[str] = PrivateAttr(default_factory=list)
+
+    @classmethod
+    def from_db_row(
+        cls,
+        response: str,
+        chat_data_json: Optional[Union[str, bytes]] = None,
+        timestamp: Optional[datetime] = None,
+    ) -> "ChatRecord":
+        """Build a record from raw column values, parsing chat_data JSON in one pass."""
+        chat_data = None
+        if chat_data_json:
+            try:
+                chat_data = ChatDataStructure.model_validate_json(chat_data_json)
+            except ValidationError as e:
+                print(f"Warning: Failed to parse chat_data: {e}")
+        return cls(response=response, chat_data=chat_data, timestamp=timestamp)
+
     @field_validator("chat_data", mode="before")
     @classmethod
     def parse_chat_data_json(cls, v):
-        """Parse stringified JSON chat_data."""
-        if isinstance(v, str) and v.strip():
+        """Parse stringified JSON chat_data (fallback for callers not using from_db_row)."""
+        if isinstance(v, (str, bytes)) and v:
             try:
-                parsed_data = json.loads(v)
+                parsed_data = orjson.loads(v)
                 if isinstance(parsed_data, dict) and "output" in parsed_data:
-                    return ChatDataStructure(**parsed_data)
-            except (json.JSONDecodeError, Exception) as e:
+                    return ChatDataStructure.model_validate(parsed_data)
+            except (orjson.JSONDecodeError, ValidationError) as e:
                 print(f"Warning: Failed to parse chat_data: {e}")
                 return None
         return v
@@ -40,30 +58,24 @@ class ChatRecord(BaseModel):
     def extract_response_from_chat_data(self):
         """Extract text from chat_data and update response after model is built."""
         if self.chat_data is not None:
-            extracted_texts = []
-            for output_item in self.chat_data.output:
-                for content_item in output_item.content:
-                    if content_item.type == "output_text":
-                        extracted_texts.append(content_item.text)
-
-            if extracted_texts:
+            texts = [
+                content_item.text
+                for output_item in self.chat_data.output
+                for content_item in output_item.content
+                if content_item.type == "output_text"
+            ]
+            self._cached_texts = texts
+
+            if texts:
                 # Create a new instance with updated response
-                object.__setattr__(self, "response", " ".join(extracted_texts))
+                object.__setattr__(self, "response", " ".join(texts))
 
         return self
 
     @property
     def extracted_texts(self) -> List[str]:
         """Get all extracted text content."""
-        if self.chat_data is None:
-            return []
-
-        texts = []
-        for output_item in self.chat_data.output:
-            for content_item in output_item.content:
-                if content_item.type == "output_text":
-                    texts.append(content_item.text)
-        return texts
+        return self._cached_texts if self.chat_data is not None else []
 
 
 # Example usage
@@ -74,3 +86,6 @@ if __name__ == "__main__":
 
     print(f"Response: '{record.response}'")  # "Hello World"
     print(f"Extracted: {record.extracted_texts}")  # ["Hello World"]
+
+    record = ChatRecord.from_db_row("placeholder", stringified_chat_data)
+    print(f"From row: '{record.response}'")  # "Hello World"
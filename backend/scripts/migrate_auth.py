@@ -11,7 +11,8 @@ from pathlib import Path
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel, create_engine, Session, select, text
 from oneline_chat.core.config import Settings
 from oneline_chat.db.models import User, UserSession, OnelineChat
 from oneline_chat.core.logging import setup_logging, get_logger
@@ -21,19 +22,17 @@ setup_logging()
 logger = get_logger(__name__)
 
 
-def create_auth_tables():
-    """Create authentication tables in the database."""
-    # Load settings
+def create_migration_engine() -> Engine:
+    """Create the single engine shared by all migration steps."""
     settings = Settings()
     
-    # Create database URL
-    database_url = f"postgresql://{settings.database.user}:{settings.database.password}@{settings.database.host}:{settings.database.port}/{settings.database.name}"
-    
     logger.info(f"Connecting to database: {settings.database.name} on {settings.database.host}")
     
-    # Create engine
-    engine = create_engine(database_url, echo=False)
-    
+    return create_engine(settings.database.url, echo=False, pool_pre_ping=True)
+
+
+def create_auth_tables(engine: Engine):
+    """Create authentication tables in the database."""
     try:
         # Create all tables
         logger.info("Creating authentication tables...")
@@ -50,19 +49,12 @@ def create_auth_tables():
     except Exception as e:
         logger.error(f"Failed to create tables: {e}")
         raise
-    finally:
-        engine.dispose()
 
 
-def add_user_id_to_existing_chats():
+def add_user_id_to_existing_chats(engine: Engine):
     """Add user_id column to existing chat records (nullable)."""
-    settings = Settings()
-    database_url = f"postgresql://{settings.database.user}:{settings.database.password}@{settings.database.host}:{settings.database.port}/{settings.database.name}"
-    
-    engine = create_engine(database_url, echo=False)
-    
     try:
-        with engine.connect() as conn:
+        with engine.begin() as conn:
             # Check if user_id column already exists
             result = conn.execute(text("""
                 SELECT column_name 
@@ -77,7 +69,6 @@ def add_user_id_to_existing_chats():
                     ADD COLUMN IF NOT EXISTS user_id INTEGER 
                     REFERENCES users(id) ON DELETE CASCADE
                 """))
-                conn.commit()
                 logger.info("✓ user_id column added to oneline_chat table")
             else:
                 logger.info("✓ user_id column already exists in oneline_chat table")
@@ -86,20 +77,20 @@ def add_user_id_to_existing_chats():
         logger.error(f"Failed to add user_id column: {e}")
         # This is not critical - existing chats will just not have a user
         logger.warning("Existing chats will not be associated with users")
-    finally:
-        engine.dispose()
 
 
 def main():
     """Run the migration."""
     logger.info("Starting authentication migration...")
     
+    engine = create_migration_engine()
+    
     try:
         # Create authentication tables
-        create_auth_tables()
+        create_auth_tables(engine)
         
         # Update existing tables
-        add_user_id_to_existing_chats()
+        add_user_id_to_existing_chats(engine)
         
         logger.info("✅ Migration completed successfully!")
         logger.info("You can now use authentication features in your application.")
@@ -107,8 +98,9 @@ def main():
     except Exception as e:
         logger.error(f"❌ Migration failed: {e}")
         sys.exit(1)
+    finally:
+        engine.dispose()
 
 
 if __name__ == "__main__":
-    from sqlmodel import select, text
     main()
\ No newline at end of file
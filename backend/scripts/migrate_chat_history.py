@@ -11,7 +11,8 @@ from pathlib import Path
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from sqlmodel import SQLModel, create_engine, Session, select, text
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel, create_engine, select, text
 from oneline_chat.core.config import Settings
 from oneline_chat.db.models import OnelineChat
 from oneline_chat.core.logging import setup_logging, get_logger
@@ -21,17 +22,19 @@ setup_logging()
 logger = get_logger(__name__)
 
 
-def add_chat_metadata_fields():
-    """Add chat metadata fields to existing oneline_chat table."""
+def create_migration_engine() -> Engine:
+    """Create the single engine shared by all migration steps."""
     settings = Settings()
-    database_url = f"postgresql://{settings.database.user}:{settings.database.password}@{settings.database.host}:{settings.database.port}/{settings.database.name}"
     
     logger.info(f"Connecting to database: {settings.database.name} on {settings.database.host}")
     
-    engine = create_engine(database_url, echo=False)
-    
+    return create_engine(settings.database.url, echo=False, pool_pre_ping=True)
+
+
+def add_chat_metadata_fields(engine: Engine):
+    """Add chat metadata fields to existing oneline_chat table."""
     try:
-        with engine.connect() as conn:
+        with engine.begin() as conn:
             # Check if columns already exist
             result = conn.execute(text("""
                 SELECT column_name 
@@ -43,154 +46,128 @@ def add_chat_metadata_fields():
             existing_columns = {row[0] for row in result.fetchall()}
             logger.info(f"Existing columns: {existing_columns}")
             
-            # Add missing columns
-            migrations = []
+            # Collect missing columns so they are added in a single ALTER TABLE
+            add_clauses = []
             
             if 'chat_title' not in existing_columns:
-                migrations.append("""
-                    ALTER TABLE oneline_chat 
-                    ADD COLUMN chat_title VARCHAR(255) DEFAULT NULL
-                """)
+                add_clauses.append("ADD COLUMN chat_title VARCHAR(255) DEFAULT NULL")
                 logger.info("Will add chat_title column")
             
             if 'created_at' not in existing_columns:
-                migrations.append("""
-                    ALTER TABLE oneline_chat 
-                    ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                """)
+                add_clauses.append("ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
                 logger.info("Will add created_at column")
             
             if 'updated_at' not in existing_columns:
-                migrations.append("""
-                    ALTER TABLE oneline_chat 
-                    ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                """)
+                add_clauses.append("ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
                 logger.info("Will add updated_at column")
                 
             if 'is_deleted' not in existing_columns:
-                migrations.append("""
-                    ALTER TABLE oneline_chat 
-                    ADD COLUMN is_deleted BOOLEAN DEFAULT FALSE
-                """)
+                add_clauses.append("ADD COLUMN is_deleted BOOLEAN DEFAULT FALSE")
                 logger.info("Will add is_deleted column")
             
-            # Execute migrations
-            for migration in migrations:
-                logger.info(f"Executing: {migration.strip()}")
+            # Execute migration (one lock acquisition for all columns)
+            if add_clauses:
+                migration = "ALTER TABLE oneline_chat " + ", ".join(add_clauses)
+                logger.info(f"Executing: {migration}")
                 conn.execute(text(migration))
-            
-            if migrations:
-                conn.commit()
-                logger.info(f"✓ Added {len(migrations)} new columns to oneline_chat table")
+                logger.info(f"✓ Added {len(add_clauses)} new columns to oneline_chat table")
             else:
                 logger.info("✓ All columns already exist in oneline_chat table")
                 
     except Exception as e:
         logger.error(f"Failed to add chat metadata columns: {e}")
         raise
-    finally:
-        engine.dispose()
 
 
-def populate_existing_data():
+def populate_existing_data(engine: Engine):
     """Populate metadata for existing chat records."""
-    settings = Settings()
-    database_url = f"postgresql://{settings.database.user}:{settings.database.password}@{settings.database.host}:{settings.database.port}/{settings.database.name}"
-    
-    engine = create_engine(database_url, echo=False)
-    
     try:
-        with Session(engine) as session:
-            # Update created_at and updated_at for existing records that have NULL values
-            logger.info("Updating timestamps for existing chat records...")
-            
-            # Set created_at and updated_at to msg_timestamp for existing records
-            session.execute(text("""
-                UPDATE oneline_chat 
-                SET created_at = msg_timestamp, 
-                    updated_at = msg_timestamp 
-                WHERE created_at IS NULL OR updated_at IS NULL
-            """))
+        with engine.begin() as conn:
+            # Fill missing timestamps and chat titles in a single table scan
+            logger.info("Updating timestamps and chat titles for existing chat records...")
             
-            # Generate chat titles for existing chats based on first message
-            logger.info("Generating chat titles for existing chats...")
-            
-            session.execute(text("""
+            conn.execute(text("""
                 UPDATE oneline_chat 
-                SET chat_title = CASE 
-                    WHEN LENGTH(question) > 50 
-                    THEN SUBSTRING(question FROM 1 FOR 47) || '...'
-                    ELSE question
-                END
-                WHERE chat_title IS NULL 
-                AND question IS NOT NULL 
-                AND question != ''
+                SET created_at = COALESCE(created_at, msg_timestamp), 
+                    updated_at = COALESCE(updated_at, msg_timestamp), 
+                    chat_title = COALESCE(chat_title, CASE 
+                        WHEN LENGTH(question) > 50 
+                        THEN SUBSTRING(question FROM 1 FOR 47) || '...'
+                        ELSE NULLIF(question, '')
+                    END)
+                WHERE created_at IS NULL 
+                OR updated_at IS NULL 
+                OR (chat_title IS NULL AND question IS NOT NULL AND question != '')
             """))
             
-            session.commit()
             logger.info("✓ Updated existing chat records with metadata")
             
     except Exception as e:
         logger.error(f"Failed to populate existing data: {e}")
         raise
-    finally:
-        engine.dispose()
 
 
-def create_indexes():
+def create_indexes(engine: Engine):
     """Create indexes for better query performance."""
-    settings = Settings()
-    database_url = f"postgresql://{settings.database.user}:{settings.database.password}@{settings.database.host}:{settings.database.port}/{settings.database.name}"
-    
-    engine = create_engine(database_url, echo=False)
-    
     try:
-        with engine.connect() as conn:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
             logger.info("Creating indexes for chat history queries...")
             
-            # Index for user chat queries
+            # Covering index for user chat list queries (index-only scans).
+            # It gets a new name because IF NOT EXISTS would silently keep an
+            # older idx_oneline_chat_user_updated without the INCLUDE columns.
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_oneline_chat_user_updated 
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oneline_chat_user_updated_cov 
                 ON oneline_chat(user_id, updated_at DESC) 
+                INCLUDE (chat_title, chat_id) 
                 WHERE is_deleted = FALSE
             """))
             
             # Index for chat_id queries
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_oneline_chat_chat_id_updated 
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oneline_chat_chat_id_updated 
                 ON oneline_chat(chat_id, updated_at DESC) 
                 WHERE is_deleted = FALSE
             """))
             
-            # Index for soft delete queries
+            # Index for per-user chat lookups and ownership checks, which
+            # also read soft-deleted rows
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_oneline_chat_deleted 
-                ON oneline_chat(is_deleted)
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oneline_chat_chat_user
+                ON oneline_chat(chat_id, user_id, is_deleted)
             """))
+
+            # Drop indexes superseded by the ones above; the partial indexes
+            # already encode the soft delete predicate
+            for index_name in (
+                "idx_oneline_chat_user_updated",
+                "idx_oneline_chat_deleted",
+            ):
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
             
-            conn.commit()
             logger.info("✓ Created performance indexes")
             
     except Exception as e:
         logger.error(f"Failed to create indexes: {e}")
         raise
-    finally:
-        engine.dispose()
 
 
 def main():
     """Run the chat history migration."""
     logger.info("Starting chat history migration...")
     
+    engine = create_migration_engine()
+    
     try:
         # Add new columns
-        add_chat_metadata_fields()
+        add_chat_metadata_fields(engine)
         
         # Populate existing data
-        populate_existing_data()
+        populate_existing_data(engine)
         
         # Create performance indexes
-        create_indexes()
+        create_indexes(engine)
         
         logger.info("✅ Chat history migration completed successfully!")
         logger.info("You can now use chat history features in your application.")
@@ -198,6 +175,8 @@ def main():
     except Exception as e:
         logger.error(f"❌ Migration failed: {e}")
         sys.exit(1)
+    finally:
+        engine.dispose()
 
 
 if __name__ == "__main__":
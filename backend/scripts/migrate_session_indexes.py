@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Migration script to add covering indexes for session token lookups.
+"""
+
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from sqlmodel import create_engine, text
+from oneline_chat.core.config import settings
+
+def main():
+    print("🔄 Creating covering indexes for user_sessions...")
+
+    try:
+        engine = create_engine(settings.database.url)
+
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            print("Creating covering index on session_token...")
+
+            # Unique covering index so token lookups are index-only scans
+            conn.execute(text("""
+                CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_user_sessions_token_covering
+                ON user_sessions(session_token) INCLUDE (user_id, expires_at)
+            """))
+
+            # Index on expires_at for expired session cleanup. A partial
+            # "WHERE expires_at > now()" predicate is not allowed because
+            # now() is not immutable.
+            print("Creating index on expires_at...")
+            conn.execute(text("""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_sessions_expires
+                ON user_sessions(expires_at)
+            """))
+
+            # The covering index enforces uniqueness, so the original
+            # single-column unique constraint is redundant
+            print("Dropping redundant session_token constraint...")
+            conn.execute(text("""
+                ALTER TABLE user_sessions
+                DROP CONSTRAINT IF EXISTS user_sessions_session_token_key
+            """))
+
+            print("✅ user_sessions indexes created successfully")
+
+        engine.dispose()
+        return 0
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,7 +19,7 @@ def main():
     try:
         engine = create_engine(settings.database.url)
         
-        with engine.connect() as conn:
+        with engine.begin() as conn:
             print("Creating shared_chats table...")
             
             # Create the shared_chats table
@@ -38,31 +38,47 @@ def main():
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
                 )
             """))
-            
+        
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
             # Create indexes for better performance
             print("Creating indexes...")
             
-            # Index on share_token for fast lookups
+            # Unique covering index so share token resolution is index-only
+            conn.execute(text("""
+                CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_shared_chats_share_token_covering 
+                ON shared_chats(share_token) INCLUDE (chat_id, owner_id, expires_at)
+            """))
+            
+            # Index on owner_id and chat_id for ownership checks
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_shared_chats_share_token 
-                ON shared_chats(share_token)
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_shared_chats_owner_chat 
+                ON shared_chats(owner_id, chat_id)
             """))
             
-            # Index on chat_id and owner_id for ownership checks
+            # Partial index on expires_at for public access
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_shared_chats_chat_owner 
-                ON shared_chats(chat_id, owner_id)
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_shared_chats_public_expires 
+                ON shared_chats(expires_at) WHERE is_public = TRUE
             """))
             
-            # Index on is_public and expires_at for public access
+            # Drop indexes and constraints superseded by the ones above
+            print("Dropping superseded indexes...")
+            for index_name in (
+                "idx_shared_chats_share_token",
+                "idx_shared_chats_chat_owner",
+                "idx_shared_chats_public_access",
+            ):
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+            
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_shared_chats_public_access 
-                ON shared_chats(is_public, expires_at)
+                ALTER TABLE shared_chats 
+                DROP CONSTRAINT IF EXISTS shared_chats_share_token_key
             """))
             
-            conn.commit()
             print("✅ shared_chats table and indexes created successfully")
         
+        engine.dispose()
         return 0
         
     except Exception as e:
@@ -1,6 +1,26 @@
 #!/usr/bin/env python3
 """
 Migration script to change user_id column type to support both integers and strings.
+
+The column is converted online instead of with ALTER COLUMN TYPE, which
+rewrites the whole table under an exclusive lock:
+
+1. Add a nullable user_id_new VARCHAR column and a trigger that keeps it
+   in sync for rows inserted or whose user_id changes from then on.
+2. Backfill it in id windows of BATCH_SIZE rows, committing each batch.
+3. Build an index on the new column concurrently.
+4. In one short transaction, drop the trigger and swap the columns
+   (user_id -> user_id_old, user_id_new -> user_id).
+
+Rollback: until user_id_old is dropped, the previous column can be restored with
+    ALTER TABLE oneline_chat RENAME COLUMN user_id TO user_id_new;
+    ALTER TABLE oneline_chat RENAME COLUMN user_id_old TO user_id;
+Once verified, drop user_id_old (this also drops indexes built on it) and re-run
+migrate_chat_history.py to rebuild the user_id indexes.
+
+If the migration stops before the swap, re-running it resumes the backfill. To
+abandon it instead, drop the sync trigger and function (SYNC_TRIGGER,
+SYNC_FUNCTION) and the user_id_new column.
 """
 
 import sys
@@ -13,35 +33,109 @@ sys.path.insert(0, str(src_path))
 from sqlmodel import create_engine, text
 from oneline_chat.core.config import settings
 
+BATCH_SIZE = 10_000
+SYNC_FUNCTION = "oneline_chat_sync_user_id_new"
+SYNC_TRIGGER = "trg_oneline_chat_sync_user_id_new"
+
 def main():
     print("🔄 Updating user_id column to support both integers and strings...")
-    
+
+    engine = create_engine(settings.database.url)
+
     try:
-        engine = create_engine(settings.database.url)
-        
         with engine.connect() as conn:
-            print("Changing user_id column type to VARCHAR...")
-            
+            data_type = conn.execute(text("""
+                SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'oneline_chat' AND column_name = 'user_id'
+            """)).scalar()
+
+        if data_type is None:
+            print("❌ oneline_chat.user_id column not found; start the application once to create the tables")
+            return 1
+
+        if data_type == "character varying":
+            print("✅ user_id column already supports both integers and strings")
+            return 0
+
+        with engine.begin() as conn:
+            print("Adding user_id_new column...")
+
             # Remove foreign key constraint first
             conn.execute(text("""
-                ALTER TABLE oneline_chat 
+                ALTER TABLE oneline_chat
                 DROP CONSTRAINT IF EXISTS oneline_chat_user_id_fkey
             """))
-            
-            # Change column type to VARCHAR
+
+            conn.execute(text("""
+                ALTER TABLE oneline_chat
+                ADD COLUMN IF NOT EXISTS user_id_new VARCHAR
+            """))
+
+            # Keep user_id_new current for rows written during the backfill,
+            # so the final swap does not have to re-scan the table
+            conn.execute(text(f"""
+                CREATE OR REPLACE FUNCTION {SYNC_FUNCTION}() RETURNS trigger AS $$
+                BEGIN
+                    NEW.user_id_new := NEW.user_id::text;
+                    RETURN NEW;
+                END;
+                $$ LANGUAGE plpgsql
+            """))
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {SYNC_TRIGGER} ON oneline_chat"))
+            conn.execute(text(f"""
+                CREATE TRIGGER {SYNC_TRIGGER}
+                BEFORE INSERT OR UPDATE OF user_id ON oneline_chat
+                FOR EACH ROW EXECUTE FUNCTION {SYNC_FUNCTION}()
+            """))
+
+            min_id, max_id = conn.execute(text(
+                "SELECT MIN(id), MAX(id) FROM oneline_chat"
+            )).one()
+
+        # Backfill in windows so each batch holds row locks only briefly
+        if max_id is not None:
+            print(f"Backfilling user_id_new for ids {min_id}..{max_id}...")
+            for lo in range(min_id, max_id + 1, BATCH_SIZE):
+                with engine.begin() as conn:
+                    conn.execute(text("""
+                        UPDATE oneline_chat SET user_id_new = user_id::text
+                        WHERE id >= :lo AND id < :hi
+                          AND user_id_new IS DISTINCT FROM user_id::text
+                    """), {"lo": lo, "hi": lo + BATCH_SIZE})
+
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            print("Creating index on user_id_new...")
             conn.execute(text("""
-                ALTER TABLE oneline_chat 
-                ALTER COLUMN user_id TYPE VARCHAR USING user_id::text
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oneline_chat_user_id_str
+                ON oneline_chat(user_id_new)
             """))
-            
-            conn.commit()
-            print("✅ user_id column updated to support both integers and strings")
-        
+
+        with engine.begin() as conn:
+            print("Swapping user_id columns...")
+
+            # The trigger kept user_id_new in sync, so the table lock is held
+            # only for dropping it and the two renames
+            conn.execute(text(f"DROP TRIGGER {SYNC_TRIGGER} ON oneline_chat"))
+            conn.execute(text(f"DROP FUNCTION {SYNC_FUNCTION}()"))
+            conn.execute(text(
+                "ALTER TABLE oneline_chat RENAME COLUMN user_id TO user_id_old"
+            ))
+            conn.execute(text(
+                "ALTER TABLE oneline_chat RENAME COLUMN user_id_new TO user_id"
+            ))
+
+        print("✅ user_id column updated to support both integers and strings")
+        print("ℹ️  Drop user_id_old once verified, then re-run migrate_chat_history.py")
+
         return 0
-        
+
     except Exception as e:
         print(f"❌ Migration failed: {e}")
         return 1
 
+    finally:
+        engine.dispose()
+
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -5,15 +5,18 @@ Authentication API endpoints.
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from datetime import datetime
+import hashlib
 
-from ..db.database import get_session
+from cachetools import TTLCache
+
+from ..db.database import engine, get_session
 from ..db.repository import UserRepository
 from ..db.models import User
 from ..core.auth_utils import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
     generate_session_token,
     create_access_token,
     create_session_expiry
@@ -24,6 +27,58 @@ from sqlmodel import Session
 router = APIRouter(prefix="/api/v1/auth", tags=["authentication"])
 security = HTTPBearer()
 
+# Short-lived cache of authenticated users, keyed by a hash of the session token.
+# Only a snapshot of the profile fields is kept (never the password hash), and
+# each request gets its own User built from it. Entries are dropped on logout,
+# password change and profile update in this process only; other workers may
+# keep serving a revoked token or deactivated user until the TTL expires.
+AUTH_CACHE_TTL_SECONDS = 30
+_auth_cache: TTLCache = TTLCache(maxsize=10000, ttl=AUTH_CACHE_TTL_SECONDS)
+
+
+# Session tokens are secrets.token_urlsafe(32), i.e. 43 characters
+MIN_TOKEN_LENGTH = 32
+MAX_TOKEN_LENGTH = 256
+
+
+def _is_plausible_token(token: str) -> bool:
+    """Reject malformed tokens before hashing or looking them up."""
+    return MIN_TOKEN_LENGTH <= len(token) <= MAX_TOKEN_LENGTH
+
+
+def _token_key(token: str) -> bytes:
+    """Hash a session token so raw tokens are not held in memory."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def _get_cached_user(token: str) -> Optional[User]:
+    """Return a new User built from the cached snapshot if its session has not expired."""
+    entry: Optional[Tuple[Dict[str, Any], datetime]] = _auth_cache.get(_token_key(token))
+    if entry is None:
+        return None
+    snapshot, expires_at = entry
+    if expires_at <= datetime.utcnow():
+        _auth_cache.pop(_token_key(token), None)
+        return None
+    return User(**snapshot)
+
+
+def _cache_user(token: str, user: User, expires_at: datetime) -> None:
+    """Cache a snapshot of the user's profile fields, leaving out the password hash."""
+    _auth_cache[_token_key(token)] = (user.model_dump(exclude={"password_hash"}), expires_at)
+
+
+def invalidate_cached_token(token: str) -> None:
+    """Drop a single session token from the auth cache."""
+    _auth_cache.pop(_token_key(token), None)
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    """Drop every cached session belonging to a user."""
+    for key, (snapshot, _) in list(_auth_cache.items()):
+        if snapshot["id"] == user_id:
+            _auth_cache.pop(key, None)
+
 
 # Pydantic models for request/response
 class UserRegister(BaseModel):
@@ -83,48 +138,65 @@ async def get_current_user(
 ) -> User:
     """Get current user from bearer token."""
     token = credentials.credentials
-    user_repo = UserRepository(session)
-    
-    # Get session
-    user_session = await user_repo.get_session(token)
-    if not user_session:
+    if not _is_plausible_token(token):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired session",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Get user
-    user = await user_repo.get_user_by_id(user_session.user_id)
-    if not user or not user.is_active:
+    cached_user = _get_cached_user(token)
+    if cached_user:
+        return cached_user
+    
+    user_repo = UserRepository(session)
+    
+    # Get user and session together
+    result = await user_repo.get_active_user_by_token(token)
+    if not result:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found or inactive",
+            detail="Invalid or expired session",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    user, user_session = result
+    _cache_user(token, user, user_session.expires_at)
     return user
 
 
+async def get_bearer_token(request: Request) -> Optional[str]:
+    """Extract the bearer token from the Authorization header, if any."""
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    token = auth_header.removeprefix("Bearer ").strip()
+    return token if _is_plausible_token(token) else None
+
+
 # Optional dependency - returns user if authenticated, None otherwise
 async def get_optional_user(
-    request: Request,
-    session: Session = Depends(get_session)
+    token: Optional[str] = Depends(get_bearer_token)
 ) -> Optional[User]:
     """Get current user if authenticated, None otherwise."""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
+    if not token:
         return None
     
-    token = auth_header.replace("Bearer ", "")
-    user_repo = UserRepository(session)
-    
-    user_session = await user_repo.get_session(token)
-    if not user_session:
-        return None
+    cached_user = _get_cached_user(token)
+    if cached_user:
+        return cached_user
     
-    user = await user_repo.get_user_by_id(user_session.user_id)
-    return user if user and user.is_active else None
+    # Only check out a connection once there is a token to resolve
+    with Session(engine) as session:
+        user_repo = UserRepository(session)
+        
+        result = await user_repo.get_active_user_by_token(token)
+        if not result:
+            return None
+        
+        user, user_session = result
+        _cache_user(token, user, user_session.expires_at)
+        return user
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -135,24 +207,24 @@ async def register_user(
     """Register a new user."""
     user_repo = UserRepository(session)
     
-    # Check if username already exists
-    existing_user = await user_repo.get_user_by_username(user_data.username)
-    if existing_user:
+    # Check if username or email already exists
+    username_taken, email_taken = await user_repo.check_username_or_email_taken(
+        user_data.username, user_data.email
+    )
+    if username_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
-    # Check if email already exists
-    existing_user = await user_repo.get_user_by_email(user_data.email)
-    if existing_user:
+    if email_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Hash password and create user
-    password_hash = hash_password(user_data.password)
+    password_hash = await hash_password_async(user_data.password)
     user = await user_repo.create_user(
         username=user_data.username,
         email=user_data.email,
@@ -181,13 +253,9 @@ async def login_user(
     user_repo = UserRepository(session)
     
     # Find user by username or email
-    user = None
-    if "@" in credentials.username_or_email:
-        user = await user_repo.get_user_by_email(credentials.username_or_email)
-    else:
-        user = await user_repo.get_user_by_username(credentials.username_or_email)
+    user = await user_repo.get_user_by_identity(credentials.username_or_email)
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not user or not await verify_password_async(credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -207,7 +275,19 @@ async def login_user(
     user_agent = request.headers.get("User-Agent")
     client_host = request.client.host if request.client else None
     
-    await user_repo.create_session(
+    # Build the response before committing so the user isn't reloaded afterwards
+    user_response = UserResponse(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        full_name=user.full_name,
+        is_active=user.is_active,
+        created_at=user.created_at,
+        last_login=user.last_login
+    )
+    
+    # Store session and update last login in a single commit
+    user_response.last_login = await user_repo.create_session_and_touch_login(
         user_id=user.id,
         session_token=session_token,
         expires_at=expires_at,
@@ -215,19 +295,8 @@ async def login_user(
         ip_address=client_host
     )
     
-    # Update last login
-    await user_repo.update_last_login(user.id)
-    
     return LoginResponse(
-        user=UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            full_name=user.full_name,
-            is_active=user.is_active,
-            created_at=user.created_at,
-            last_login=datetime.utcnow()
-        ),
+        user=user_response,
         session_token=session_token,
         expires_at=expires_at
     )
@@ -244,6 +313,7 @@ async def logout_user(
     token = credentials.credentials
     
     deleted = await user_repo.delete_session(token)
+    invalidate_cached_token(token)
     if not deleted:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -296,6 +366,7 @@ async def update_profile(
     
     if update_data:
         user = await user_repo.update_user(current_user.id, **update_data)
+        invalidate_cached_user(current_user.id)
     else:
         user = current_user
     
@@ -317,17 +388,29 @@ async def change_password(
     session: Session = Depends(get_session)
 ):
     """Change current user's password."""
+    user_repo = UserRepository(session)
+    
+    # Load the stored user rather than trusting the cached snapshot, so a
+    # password change or deactivation made by another worker is honoured
+    user = await user_repo.get_user_by_id(current_user.id)
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired session",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
     # Verify current password
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    if not await verify_password_async(password_data.current_password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     
     # Hash new password and update
-    user_repo = UserRepository(session)
-    new_password_hash = hash_password(password_data.new_password)
+    new_password_hash = await hash_password_async(password_data.new_password)
     await user_repo.update_user(current_user.id, password_hash=new_password_hash)
+    invalidate_cached_user(current_user.id)
     
     # Optionally, invalidate all existing sessions except current
     # await user_repo.delete_user_sessions(current_user.id)
@@ -343,5 +426,6 @@ async def logout_all_sessions(
     """Logout from all devices by deleting all sessions."""
     user_repo = UserRepository(session)
     count = await user_repo.delete_user_sessions(current_user.id)
+    invalidate_cached_user(current_user.id)
     
     return MessageResponse(message=f"Logged out from {count} sessions")
\ No newline at end of file
@@ -4,19 +4,23 @@ Chat router with OpenAI-compatible streaming endpoint.
 
 from fastapi import APIRouter, HTTPException, Depends, status, Request, Response
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, AsyncGenerator, Union, Literal
+from typing import List, Optional, Dict, Any, AsyncGenerator, Union, Literal, Tuple
 from datetime import datetime
-import json
 import asyncio
-import uuid
+import hashlib
+import logging
 import time
 import secrets
+import orjson
+from cachetools import TTLCache
 from sqlmodel import Session
 
-from ..db import get_session, PersistenceRepository, ModeEnum
+from ..db import engine, get_session, PersistenceRepository, ModeEnum
 from ..services import client, get_default_model, get_ai_provider
 from ..core.logging import get_logger
+from ..core.responses import ORJSONResponse
 from .auth_router import get_optional_user
 from ..db.models import User, ChatSummary, ChatHistoryResponse, ShareSettings, ShareResponse, SharedChatResponse
 from ..core.anonymous_session import get_user_identifier
@@ -24,6 +28,55 @@ from ..core.anonymous_session import get_user_identifier
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/v1", tags=["chat"])
 
+# Constant SSE framing, kept as bytes so no per-chunk encoding is needed
+_SSE_PREFIX = b"data: "
+_SSE_DONE = b"data: [DONE]\n\n"
+_SSE_CHUNK_FINGERPRINT = b',"system_fingerprint":'
+_SSE_CHUNK_END = b"}\n\n"
+
+# Response headers shared by all SSE streams
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Disable Nginx buffering
+}
+
+# SSE error frames; only the JSON-encoded message is filled in per error
+_SSE_CHUNK_ERROR = b'data: {"error":{"message":%b,"type":"chunk_processing_error","code":"chunk_error"}}\n\n'
+_SSE_STREAM_ERROR = b'data: {"error":{"message":%b,"type":"streaming_error","code":"internal_error"}}\n\n'
+
+# Prefix for generated completion ids, OpenAI style
+_COMPLETION_ID_PREFIX = "chatcmpl-"
+
+# Provider chunks buffered ahead of the SSE writer per stream
+_STREAM_QUEUE_SIZE = 32
+
+# Check for client disconnects every 16 chunks (chunk count & mask == 0)
+_DISCONNECT_CHECK_MASK = 0x0F
+
+# Content deltas already waiting in the queue are merged into one frame, up
+# to this many chunks or characters so time-to-first-token is not delayed
+_COALESCE_MAX_CHUNKS = 8
+_COALESCE_MAX_CHARS = 256
+_COALESCE_HEAD_KEYS = frozenset(("role", "content"))
+_COALESCE_TAIL_KEYS = frozenset(("content",))
+
+# Serialized frames are written in one send once this many bytes are
+# buffered, or sooner when the provider has nothing further queued
+_SSE_FLUSH_BYTES = 8 * 1024
+
+# Provider output (choices, usage) for identical deterministic requests
+COMPLETION_CACHE_TTL_SECONDS = 300
+_completion_cache: TTLCache = TTLCache(maxsize=2048, ttl=COMPLETION_CACHE_TTL_SECONDS)
+
+# Marks an empty look-ahead slot (None is the end-of-stream sentinel)
+_NO_CHUNK = object()
+
+
+def get_repository(session: Session = Depends(get_session)) -> PersistenceRepository:
+    """Get a persistence repository bound to the request's database session."""
+    return PersistenceRepository(session)
+
 
 # Request/Response models matching OpenAI's format
 class ChatMessage(BaseModel):
@@ -52,165 +105,349 @@ class ChatCompletionRequest(BaseModel):
     save_to_db: Optional[bool] = Field(default=True, description="Whether to save to database")
 
 
-class ChatCompletionChoice(BaseModel):
-    index: int
-    message: ChatMessage
-    finish_reason: Optional[str] = None
+def _last_user_message(messages: List[ChatMessage]) -> str:
+    """Return the content of the last user message, or an empty string."""
+    for msg in reversed(messages):
+        if msg.role == "user":
+            return msg.content
+    return ""
+
+
+def _messages_payload(messages: List[ChatMessage]) -> List[Dict[str, Any]]:
+    """Build the OpenAI messages payload via attribute access, omitting unset optional fields."""
+    payload = []
+    for msg in messages:
+        item = {"role": msg.role, "content": msg.content}
+        if msg.name:
+            item["name"] = msg.name
+        if msg.function_call:
+            item["function_call"] = msg.function_call
+        payload.append(item)
+    return payload
+
+
+def _delta_to_dict(delta: Any) -> Dict[str, Any]:
+    """Build a chunk delta dict via attribute access, omitting unset fields."""
+    if delta is None:
+        return {}
+    result = {}
+    if delta.role is not None:
+        result["role"] = delta.role
+    if delta.content is not None:
+        result["content"] = delta.content
+    if delta.function_call is not None:
+        result["function_call"] = delta.function_call.model_dump(exclude_none=True)
+    if delta.tool_calls:
+        result["tool_calls"] = [tool_call.model_dump(exclude_none=True) for tool_call in delta.tool_calls]
+    if getattr(delta, "refusal", None) is not None:
+        result["refusal"] = delta.refusal
+    return result
+
+
+def _build_openai_kwargs(request: ChatCompletionRequest) -> Dict[str, Any]:
+    """Build completion arguments for the OpenAI client, leaving out unset options."""
+    kwargs = {
+        "model": request.model,
+        "messages": _messages_payload(request.messages),
+        "temperature": request.temperature,
+        "top_p": request.top_p,
+        "n": request.n,
+        "stop": request.stop,
+        "max_tokens": request.max_tokens,
+        "presence_penalty": request.presence_penalty,
+        "frequency_penalty": request.frequency_penalty,
+        "logit_bias": request.logit_bias,
+        "user": request.user
+    }
+    return {key: value for key, value in kwargs.items() if value is not None}
 
 
-class ChatCompletionUsage(BaseModel):
-    prompt_tokens: int
-    completion_tokens: int
-    total_tokens: int
+def _completion_cache_key(openai_kwargs: Dict[str, Any]) -> bytes:
+    """Hash the provider arguments (model, messages and sampling options) into a cache key."""
+    return hashlib.blake2b(orjson.dumps(openai_kwargs, option=orjson.OPT_SORT_KEYS), digest_size=16).digest()
 
 
-class ChatCompletionResponse(BaseModel):
-    id: str
-    object: str = "chat.completion"
-    created: int
-    model: str
-    choices: List[ChatCompletionChoice]
-    usage: Optional[ChatCompletionUsage] = None
-    system_fingerprint: Optional[str] = None
+async def _drain_stream(stream: Any, queue: asyncio.Queue) -> None:
+    """
+    Read provider chunks into a queue so network reads overlap with SSE writes.
+    
+    The final item is None on success, or the exception that ended the stream.
+    """
+    try:
+        async for chunk in stream:
+            await queue.put(chunk)
+    except Exception as e:
+        await queue.put(e)
+    else:
+        await queue.put(None)
+    finally:
+        await stream.close()
 
 
-class ChatCompletionChunkChoice(BaseModel):
-    index: int
-    delta: Dict[str, Any]
-    finish_reason: Optional[str] = None
+def _coalesce_deltas(queue: asyncio.Queue, index: int, delta: Dict[str, Any]) -> Tuple[Optional[str], Any]:
+    """
+    Merge content deltas already waiting in the queue into ``delta`` in place.
+    
+    Returns the latest finish_reason and the first queued item that could not
+    be merged (``_NO_CHUNK`` if there is none), which must be handled next.
+    """
+    parts = [delta["content"]]
+    size = len(parts[0])
+    merged = 1
+    finish_reason = None
+    pending: Any = _NO_CHUNK
+    while merged < _COALESCE_MAX_CHUNKS and size < _COALESCE_MAX_CHARS and not queue.empty():
+        chunk = queue.get_nowait()
+        if chunk is None or isinstance(chunk, Exception) or len(chunk.choices) != 1:
+            pending = chunk
+            break
+        choice = chunk.choices[0]
+        next_delta = _delta_to_dict(choice.delta)
+        if choice.index != index or not next_delta.keys() <= _COALESCE_TAIL_KEYS:
+            pending = chunk
+            break
+        content = next_delta.get("content")
+        if content:
+            parts.append(content)
+            size += len(content)
+        merged += 1
+        finish_reason = choice.finish_reason
+        if finish_reason is not None:
+            break
+    delta["content"] = "".join(parts)
+    return finish_reason, pending
+
+
+class StreamCapture:
+    """Assistant text captured from a stream so it can be saved after the response ends."""
+    
+    def __init__(self, completion_id: str):
+        self.completion_id = completion_id
+        self.parts: List[str] = []
+        self.completed = False
+
+
+def _save_chat(
+    request: ChatCompletionRequest,
+    message_id: str,
+    response_content: str,
+    user_identifier: str,
+    streaming: bool
+) -> None:
+    """
+    Persist a completion once the response has been sent.
+    
+    Runs in the threadpool as a background task with its own session, since
+    the request-scoped session may already be closed by then.
+    """
+    try:
+        with Session(engine) as session:
+            PersistenceRepository(session).create_chat(
+                chat_id=request.chat_id or "chat_" + secrets.token_hex(4),
+                message_id=message_id,
+                question=_last_user_message(request.messages),
+                response=response_content,
+                mode=ModeEnum.single,
+                agents={"model": request.model, "streaming": streaming},
+                user_id=user_identifier
+            )
+    except Exception as e:
+        logger.error("Failed to save chat %s: %s", request.chat_id, e)
 
 
-class ChatCompletionChunk(BaseModel):
-    id: str
-    object: str = "chat.completion.chunk"
-    created: int
-    model: str
-    choices: List[ChatCompletionChunkChoice]
-    system_fingerprint: Optional[str] = None
+def _save_streamed_chat(
+    request: ChatCompletionRequest,
+    capture: StreamCapture,
+    user_identifier: str
+) -> None:
+    """Persist a streamed completion if the stream finished cleanly."""
+    if capture.completed:
+        _save_chat(request, capture.completion_id, "".join(capture.parts), user_identifier, True)
+
+
+def _copy_cookies(source: Response, target: Response) -> None:
+    """Carry cookies set on the injected response (e.g. the anonymous session) over to a returned one."""
+    target.raw_headers.extend(
+        header for header in source.raw_headers if header[0] == b"set-cookie"
+    )
 
 
 async def generate_streaming_response(
     request: ChatCompletionRequest,
-    session: Session,
-    http_request: Request,
-    http_response: Response,
-    current_user: Optional[User] = None
-) -> AsyncGenerator[str, None]:
+    capture: StreamCapture,
+    http_request: Optional[Request] = None
+) -> AsyncGenerator[bytes, None]:
     """
     Generate streaming response compatible with OpenAI's SSE format.
+    
+    Streamed content is collected on the capture and marked completed only
+    if the stream finished without errors. When http_request is given, the
+    upstream stream is abandoned once the client disconnects.
     """
-    completion_id = f"chatcmpl-{uuid.uuid4().hex[:29]}"
-    created_timestamp = int(time.time())
-    full_response = ""
+    completion_id = capture.completion_id
+    created_timestamp = time.time_ns() // 1_000_000_000
+    response_parts = capture.parts
     error_occurred = False
     
+    # Fields that never change within a stream are serialized once; each
+    # frame only serializes its choices and fingerprint. The open object
+    # (closing brace stripped) keeps OpenAI's chat.completion.chunk field order.
+    chunk_prefix = _SSE_PREFIX + orjson.dumps({
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created_timestamp,
+        "model": request.model
+    })[:-1] + b',"choices":'
+    
     # Log AI provider being used
-    logger.info(f"Using AI provider: {get_ai_provider()}, Model: {request.model}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Using AI provider: %s, Model: %s", get_ai_provider(), request.model)
     
     try:
         # Create OpenAI streaming request
-        stream = await client.chat.completions.create(
-            model=request.model,
-            messages=[msg.model_dump() for msg in request.messages],
-            temperature=request.temperature,
-            top_p=request.top_p,
-            n=request.n,
-            stream=True,
-            stop=request.stop,
-            max_tokens=request.max_tokens,
-            presence_penalty=request.presence_penalty,
-            frequency_penalty=request.frequency_penalty,
-            logit_bias=request.logit_bias,
-            user=request.user
-        )
+        stream = await client.chat.completions.create(**_build_openai_kwargs(request), stream=True)
         
-        # Stream chunks
-        async for chunk in stream:
-            try:
-                # Convert OpenAI chunk to our format
-                chunk_data = ChatCompletionChunk(
-                    id=completion_id,
-                    object="chat.completion.chunk",
-                    created=created_timestamp,
-                    model=request.model,
-                    choices=[
-                        ChatCompletionChunkChoice(
-                            index=choice.index,
-                            delta=choice.delta.model_dump() if choice.delta else {},
-                            finish_reason=choice.finish_reason
-                        )
-                        for choice in chunk.choices
-                    ],
-                    system_fingerprint=chunk.system_fingerprint
-                )
-                
-                # Accumulate response for database storage
-                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
-                    full_response += chunk.choices[0].delta.content
-                
-                # Send SSE formatted data
-                yield f"data: {chunk_data.model_dump_json()}\n\n"
-                
-            except Exception as chunk_error:
-                # Error processing individual chunk
-                error_chunk = {
-                    "error": {
-                        "message": f"Chunk processing error: {str(chunk_error)}",
-                        "type": "chunk_processing_error",
-                        "code": "chunk_error"
-                    }
-                }
-                yield f"data: {json.dumps(error_chunk)}\n\n"
-                error_occurred = True
-                break
+        # Stream chunks; a producer task keeps reading from the provider
+        # while each chunk is formatted and flushed to the client
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_STREAM_QUEUE_SIZE)
+        producer = asyncio.create_task(_drain_stream(stream, queue))
+        
+        # Almost every request uses n=1, so the single-choice payload is
+        # reused and updated in place rather than rebuilt per chunk
+        single_choice: Dict[str, Any] = {"index": 0, "delta": None, "finish_reason": None}
+        single_choices = [single_choice]
         
-        # Save to database if requested and no errors occurred
-        if request.save_to_db and request.chat_id and not error_occurred:
-            try:
-                repository = PersistenceRepository(session)
+        chunk_count = 0
+        pending: Any = _NO_CHUNK
+        buffer = bytearray()
+        
+        # Names used per chunk, bound to locals to skip global and
+        # attribute lookups in the loop
+        dumps = orjson.dumps
+        delta_to_dict = _delta_to_dict
+        append_part = response_parts.append
+        queue_get = queue.get
+        queue_empty = queue.empty
+        try:
+            while True:
+                if pending is _NO_CHUNK:
+                    chunk = await queue_get()
+                else:
+                    chunk, pending = pending, _NO_CHUNK
+                if chunk is None or isinstance(chunk, Exception):
+                    break
                 
-                # Get the last user message as the question
-                user_messages = [msg for msg in request.messages if msg.role == "user"]
-                question = user_messages[-1].content if user_messages else ""
+                # Stop paying for upstream tokens nobody will read
+                chunk_count += 1
+                if (
+                    http_request is not None
+                    and not chunk_count & _DISCONNECT_CHECK_MASK
+                    and await http_request.is_disconnected()
+                ):
+                    logger.info("Client disconnected, closing stream %s", completion_id)
+                    error_occurred = True
+                    break
                 
-                # Get user identifier (authenticated user ID or anonymous session)
-                user_identifier = get_user_identifier(current_user, http_request, http_response)
+                # Convert OpenAI chunk choices to our format
+                chunk_choices = chunk.choices
+                if len(chunk_choices) == 1:
+                    choice = chunk_choices[0]
+                    delta = delta_to_dict(choice.delta)
+                    finish_reason = choice.finish_reason
+                    
+                    # When the client drains slower than the provider
+                    # produces, fold the backlog into this frame
+                    if (
+                        finish_reason is None
+                        and "content" in delta
+                        and delta.keys() <= _COALESCE_HEAD_KEYS
+                        and not queue_empty()
+                    ):
+                        finish_reason, pending = _coalesce_deltas(queue, choice.index, delta)
+                    
+                    single_choice["index"] = choice.index
+                    single_choice["delta"] = delta
+                    single_choice["finish_reason"] = finish_reason
+                    choices = single_choices
+                    
+                    # Accumulate response for database storage
+                    content = delta.get("content")
+                    if content:
+                        append_part(content)
+                else:
+                    choices = [
+                        {
+                            "index": choice.index,
+                            "delta": delta_to_dict(choice.delta),
+                            "finish_reason": choice.finish_reason
+                        }
+                        for choice in chunk_choices
+                    ]
+                    
+                    # Accumulate response for database storage
+                    first_delta = chunk_choices[0].delta if chunk_choices else None
+                    if first_delta and first_delta.content:
+                        append_part(first_delta.content)
                 
-                chat = repository.create_chat(
-                    chat_id=request.chat_id or f"chat_{uuid.uuid4().hex[:8]}",
-                    message_id=completion_id,
-                    question=question,
-                    response=full_response,
-                    mode=ModeEnum.single,
-                    agents={"model": request.model, "streaming": True},
-                    user_id=user_identifier
-                )
-            except Exception as db_error:
-                # Database save error - send error but don't break the stream
-                error_chunk = {
-                    "error": {
-                        "message": f"Database save error: {str(db_error)}",
-                        "type": "database_error",
-                        "code": "db_error"
-                    }
-                }
-                yield f"data: {json.dumps(error_chunk)}\n\n"
+                # Buffer SSE formatted data; frames are written together
+                # once the buffer fills or nothing else is queued
+                buffer += chunk_prefix
+                buffer += dumps(choices)
+                buffer += _SSE_CHUNK_FINGERPRINT
+                buffer += dumps(chunk.system_fingerprint)
+                buffer += _SSE_CHUNK_END
+                if len(buffer) >= _SSE_FLUSH_BYTES or (pending is _NO_CHUNK and queue_empty()):
+                    yield bytes(buffer)
+                    buffer.clear()
             
+            if buffer:
+                yield bytes(buffer)
+        except Exception as chunk_error:
+            # Error processing a chunk ends the stream
+            yield bytes(buffer) + _SSE_CHUNK_ERROR % orjson.dumps(f"Chunk processing error: {str(chunk_error)}")
+            error_occurred = True
+        finally:
+            producer.cancel()
+        
+        # Provider errors are reported as streaming errors below
+        if isinstance(chunk, Exception):
+            raise chunk
+        
+        capture.completed = not error_occurred
+        
     except Exception as e:
         # General error (OpenAI API, network, etc.)
-        error_chunk = {
-            "error": {
-                "message": str(e),
-                "type": "streaming_error",
-                "code": "internal_error"
-            }
-        }
-        yield f"data: {json.dumps(error_chunk)}\n\n"
+        yield _SSE_STREAM_ERROR % orjson.dumps(str(e))
         error_occurred = True
     
     finally:
         # Always send [DONE] to signal stream completion, regardless of success or error
-        yield "data: [DONE]\n\n"
+        yield _SSE_DONE
+
+
+def _streaming_response(
+    request: ChatCompletionRequest,
+    http_request: Request,
+    http_response: Response,
+    current_user: Optional[User]
+) -> StreamingResponse:
+    """Build the SSE response, saving the completion in a background task after it is sent."""
+    capture = StreamCapture(_COMPLETION_ID_PREFIX + secrets.token_hex(15)[:29])
+    
+    background = None
+    if request.save_to_db and request.chat_id:
+        # Resolve before streaming so a new anonymous session cookie is sent
+        user_identifier = get_user_identifier(current_user, http_request, http_response)
+        background = BackgroundTask(_save_streamed_chat, request, capture, user_identifier)
+    
+    response = StreamingResponse(
+        generate_streaming_response(request, capture, http_request),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS,
+        background=background
+    )
+    _copy_cookies(http_response, response)
+    return response
 
 
 @router.post("/chat/completions", response_model=None)
@@ -218,7 +455,6 @@ async def create_chat_completion(
     request: ChatCompletionRequest,
     http_request: Request,
     http_response: Response,
-    session: Session = Depends(get_session),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
@@ -240,84 +476,81 @@ async def create_chat_completion(
     
     if request.stream:
         # Return streaming response
-        return StreamingResponse(
-            generate_streaming_response(request, session, http_request, http_response, current_user),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",  # Disable Nginx buffering
-            }
-        )
+        return _streaming_response(request, http_request, http_response, current_user)
     else:
         # Non-streaming response
         try:
-            # Log AI provider being used
-            logger.info(f"Using AI provider: {get_ai_provider()}, Model: {request.model}")
+            openai_kwargs = _build_openai_kwargs(request)
             
-            completion = await client.chat.completions.create(
-                model=request.model,
-                messages=[msg.model_dump() for msg in request.messages],
-                temperature=request.temperature,
-                top_p=request.top_p,
-                n=request.n,
-                stream=False,
-                stop=request.stop,
-                max_tokens=request.max_tokens,
-                presence_penalty=request.presence_penalty,
-                frequency_penalty=request.frequency_penalty,
-                logit_bias=request.logit_bias,
-                user=request.user
-            )
+            # Only deterministic (temperature 0) completions are cached
+            cache_key = _completion_cache_key(openai_kwargs) if request.temperature == 0 else None
+            result = _completion_cache.get(cache_key) if cache_key is not None else None
             
-            # Save to database if requested
-            if request.save_to_db and request.chat_id:
-                repository = PersistenceRepository(session)
+            if result is not None:
+                # A hit is answered as a new completion with its own id
+                completion_id = _COMPLETION_ID_PREFIX + secrets.token_hex(15)[:29]
+                created = time.time_ns() // 1_000_000_000
+            else:
+                # Log AI provider being used
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Using AI provider: %s, Model: %s", get_ai_provider(), request.model)
                 
-                # Get the last user message as the question
-                user_messages = [msg for msg in request.messages if msg.role == "user"]
-                question = user_messages[-1].content if user_messages else ""
+                completion = await client.chat.completions.create(**openai_kwargs, stream=False)
+                completion_id = completion.id
+                created = completion.created
                 
-                # Get the assistant's response
-                response_content = completion.choices[0].message.content if completion.choices else ""
+                # Convert to our response format as a plain dict in OpenAI's
+                # chat.completion shape, without re-validating the SDK objects.
+                # Only the provider's output is cached, never id or created.
+                usage = completion.usage
+                result = {
+                    "model": completion.model,
+                    "choices": [
+                        {
+                            "index": choice.index,
+                            "message": {
+                                "role": choice.message.role,
+                                "content": choice.message.content,
+                                "name": None,
+                                "function_call": None
+                            },
+                            "finish_reason": choice.finish_reason
+                        }
+                        for choice in completion.choices
+                    ],
+                    "usage": {
+                        "prompt_tokens": usage.prompt_tokens,
+                        "completion_tokens": usage.completion_tokens,
+                        "total_tokens": usage.total_tokens
+                    } if usage else None,
+                    "system_fingerprint": completion.system_fingerprint
+                }
                 
+                if cache_key is not None:
+                    _completion_cache[cache_key] = result
+            
+            # Get the assistant's response
+            choices = result["choices"]
+            response_content = choices[0]["message"]["content"] if choices else ""
+            
+            # Save to database if requested, after the response is sent
+            background = None
+            if request.save_to_db and request.chat_id:
                 # Get user identifier (authenticated user ID or anonymous session)
                 user_identifier = get_user_identifier(current_user, http_request, http_response)
                 
-                chat = repository.create_chat(
-                    chat_id=request.chat_id or f"chat_{uuid.uuid4().hex[:8]}",
-                    message_id=completion.id,
-                    question=question,
-                    response=response_content,
-                    mode=ModeEnum.single,
-                    agents={"model": request.model, "streaming": False},
-                    user_id=user_identifier
+                background = BackgroundTask(
+                    _save_chat, request, completion_id, response_content, user_identifier, False
                 )
             
-            # Convert to our response format
-            response = ChatCompletionResponse(
-                id=completion.id,
-                object="chat.completion",
-                created=completion.created,
-                model=completion.model,
-                choices=[
-                    ChatCompletionChoice(
-                        index=choice.index,
-                        message=ChatMessage(
-                            role=choice.message.role,
-                            content=choice.message.content
-                        ),
-                        finish_reason=choice.finish_reason
-                    )
-                    for choice in completion.choices
-                ],
-                usage=ChatCompletionUsage(
-                    prompt_tokens=completion.usage.prompt_tokens,
-                    completion_tokens=completion.usage.completion_tokens,
-                    total_tokens=completion.usage.total_tokens
-                ) if completion.usage else None,
-                system_fingerprint=completion.system_fingerprint
-            )
+            response = ORJSONResponse(content={
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                **result
+            }, background=background)
+            
+            _copy_cookies(http_response, response)
             
             return response
             
@@ -333,7 +566,6 @@ async def create_streaming_chat(
     request: ChatCompletionRequest,
     http_request: Request,
     http_response: Response,
-    session: Session = Depends(get_session),
     current_user: Optional[User] = Depends(get_optional_user)
 ) -> StreamingResponse:
     """
@@ -342,33 +574,22 @@ async def create_streaming_chat(
     This endpoint forces streaming regardless of the 'stream' parameter.
     """
     request.stream = True
-    return StreamingResponse(
-        generate_streaming_response(request, session, http_request, http_response, current_user),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
-    )
+    return _streaming_response(request, http_request, http_response, current_user)
 
 
-@router.get("/chat/history/{chat_id}")
+@router.get("/chat/history/{chat_id}", response_model=List[Dict[str, Any]])
 async def get_chat_history(
     chat_id: str,
-    session: Session = Depends(get_session),
+    repository: PersistenceRepository = Depends(get_repository),
     current_user: Optional[User] = Depends(get_optional_user)
-) -> List[Dict[str, Any]]:
+) -> ORJSONResponse:
     """
     Get chat history for a specific chat_id.
     If user is authenticated, only return their chats.
     """
-    repository = PersistenceRepository(session)
-    chats = repository.get_chat_by_id(chat_id)
-    
-    # Filter by user if authenticated
-    if current_user:
-        chats = [chat for chat in chats if chat.user_id == current_user.id]
+    # Filter by user in SQL if authenticated
+    user_id = current_user.id_str if current_user else None
+    chats = await asyncio.to_thread(repository.get_chat_by_id, chat_id, user_id=user_id)
     
     if not chats:
         raise HTTPException(
@@ -376,56 +597,65 @@ async def get_chat_history(
             detail=f"No chat history found for chat_id: {chat_id}"
         )
     
-    return [
+    # orjson serializes datetime (ISO 8601, same as isoformat()) and enum
+    # values natively, so rows are passed through unconverted
+    return ORJSONResponse(content=[
         {
             "message_id": chat.message_id,
             "question": chat.question,
             "response": chat.response,
-            "timestamp": chat.msg_timestamp.isoformat(),
-            "mode": chat.mode.value,
+            "timestamp": chat.msg_timestamp,
+            "mode": chat.mode,
             "agents": chat.agents
         }
         for chat in chats
+    ])
+
+
+# Static model list, serialized once at import time
+_MODELS_PAYLOAD_BYTES = orjson.dumps({
+    "object": "list",
+    "data": [
+        {
+            "id": "gpt-3.5-turbo",
+            "object": "model",
+            "created": 1677610602,
+            "owned_by": "openai",
+            "permission": [],
+            "root": "gpt-3.5-turbo",
+            "parent": None
+        },
+        {
+            "id": "gpt-4",
+            "object": "model",
+            "created": 1687882411,
+            "owned_by": "openai",
+            "permission": [],
+            "root": "gpt-4",
+            "parent": None
+        },
+        {
+            "id": "gpt-4-turbo-preview",
+            "object": "model",
+            "created": 1706745304,
+            "owned_by": "openai",
+            "permission": [],
+            "root": "gpt-4-turbo-preview",
+            "parent": None
+        }
     ]
+})
 
+# The model list never changes within a process, so clients may cache it
+_MODELS_HEADERS = {"Cache-Control": "public, max-age=3600"}
 
-@router.get("/models")
-async def list_models() -> Dict[str, Any]:
+
+@router.get("/models", response_model=Dict[str, Any])
+async def list_models() -> Response:
     """
     List available models (OpenAI-compatible endpoint).
     """
-    return {
-        "object": "list",
-        "data": [
-            {
-                "id": "gpt-3.5-turbo",
-                "object": "model",
-                "created": 1677610602,
-                "owned_by": "openai",
-                "permission": [],
-                "root": "gpt-3.5-turbo",
-                "parent": None
-            },
-            {
-                "id": "gpt-4",
-                "object": "model",
-                "created": 1687882411,
-                "owned_by": "openai",
-                "permission": [],
-                "root": "gpt-4",
-                "parent": None
-            },
-            {
-                "id": "gpt-4-turbo-preview",
-                "object": "model",
-                "created": 1706745304,
-                "owned_by": "openai",
-                "permission": [],
-                "root": "gpt-4-turbo-preview",
-                "parent": None
-            }
-        ]
-    }
+    return Response(content=_MODELS_PAYLOAD_BYTES, media_type="application/json", headers=_MODELS_HEADERS)
 
 
 # Chat History Management endpoints
@@ -439,43 +669,42 @@ async def get_all_chats(
     limit: int = 50,
     offset: int = 0,
     search: Optional[str] = None,
-    session: Session = Depends(get_session),
+    repository: PersistenceRepository = Depends(get_repository),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     Get all chat sessions for the current user.
     Supports pagination and search functionality.
     """
-    repository = PersistenceRepository(session)
-    
     # Get user_id if authenticated, otherwise None for anonymous chats
-    user_id = str(current_user.id) if current_user else None
+    user_id = current_user.id_str if current_user else None
     
-    chats = repository.get_all_chats(
+    chats = await asyncio.to_thread(
+        repository.get_all_chats,
         user_id=user_id,
         limit=limit,
         offset=offset,
         search_query=search
     )
     
-    return chats
+    # Returning a response directly skips re-validating every row against
+    # response_model, which is kept for the OpenAPI schema
+    return ORJSONResponse(content=[chat.model_dump() for chat in chats])
 
 
 @router.get("/chat/{chat_id}/full", response_model=ChatHistoryResponse)
 async def get_full_chat_history(
     chat_id: str,
-    session: Session = Depends(get_session),
+    repository: PersistenceRepository = Depends(get_repository),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     Get full chat history with all messages for a specific chat.
     """
-    repository = PersistenceRepository(session)
-    
     # Get user_id if authenticated, otherwise None for anonymous chats
-    user_id = str(current_user.id) if current_user else None
+    user_id = current_user.id_str if current_user else None
     
-    chat_history = repository.get_chat_history_with_messages(chat_id, user_id)
+    chat_history = await asyncio.to_thread(repository.get_chat_history_with_messages, chat_id, user_id)
     
     if not chat_history:
         raise HTTPException(
@@ -483,24 +712,22 @@ async def get_full_chat_history(
             detail=f"Chat history not found for chat_id: {chat_id}"
         )
     
-    return chat_history
+    return ORJSONResponse(content=chat_history.model_dump())
 
 
 @router.delete("/chat/{chat_id}")
 async def delete_chat_history(
     chat_id: str,
-    session: Session = Depends(get_session),
+    repository: PersistenceRepository = Depends(get_repository),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     Delete (soft delete) a chat session and all its messages.
     """
-    repository = PersistenceRepository(session)
-    
     # Get user_id if authenticated, otherwise None for anonymous chats
-    user_id = str(current_user.id) if current_user else None
+    user_id = current_user.id_str if current_user else None
     
-    success = repository.delete_chat(chat_id, user_id)
+    success = await asyncio.to_thread(repository.delete_chat, chat_id, user_id)
     
     if not success:
         raise HTTPException(
@@ -515,18 +742,16 @@ async def delete_chat_history(
 async def update_chat_title(
     chat_id: str,
     title_update: ChatTitleUpdate,
-    session: Session = Depends(get_session),
+    repository: PersistenceRepository = Depends(get_repository),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     Update the title of a chat session.
     """
-    repository = PersistenceRepository(session)
-    
     # Get user_id if authenticated, otherwise None for anonymous chats
-    user_id = str(current_user.id) if current_user else None
+    user_id = current_user.id_str if current_user else None
     
-    success = repository.update_chat_title(chat_id, title_update.title, user_id)
+    success = await asyncio.to_thread(repository.update_chat_title, chat_id, title_update.title, user_id)
     
     if not success:
         raise HTTPException(
@@ -540,18 +765,16 @@ async def update_chat_title(
 @router.get("/chat/{chat_id}/summary", response_model=ChatSummary)
 async def get_chat_summary(
     chat_id: str,
-    session: Session = Depends(get_session),
+    repository: PersistenceRepository = Depends(get_repository),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     Get summary information for a specific chat.
     """
-    repository = PersistenceRepository(session)
-    
     # Get user_id if authenticated, otherwise None for anonymous chats
-    user_id = str(current_user.id) if current_user else None
+    user_id = current_user.id_str if current_user else None
     
-    summary = repository.get_chat_summary(chat_id, user_id)
+    summary = await asyncio.to_thread(repository.get_chat_summary, chat_id, user_id)
     
     if not summary:
         raise HTTPException(
@@ -559,7 +782,7 @@ async def get_chat_summary(
             detail=f"Chat not found for chat_id: {chat_id}"
         )
     
-    return summary
+    return ORJSONResponse(content=summary.model_dump())
 
 
 # Share endpoints
@@ -568,15 +791,13 @@ async def share_chat(
     chat_id: str,
     settings: ShareSettings,
     request: Request,
-    session: Session = Depends(get_session),
+    repository: PersistenceRepository = Depends(get_repository),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     Share a chat publicly with custom settings.
     Only the chat owner can share their chat.
     """
-    repository = PersistenceRepository(session)
-    
     # Must be authenticated to share
     if not current_user:
         raise HTTPException(
@@ -584,89 +805,71 @@ async def share_chat(
             detail="Authentication required to share chats"
         )
     
-    # Verify the user owns this chat
-    user_id = str(current_user.id)
-    chat_messages = repository.get_chat_by_id(chat_id)
-    
-    if not chat_messages:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Chat not found"
-        )
-    
-    # Check if any message belongs to the user
-    user_owns_chat = any(msg.user_id == user_id for msg in chat_messages)
-    if not user_owns_chat:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only share your own chats"
-        )
+    user_id = current_user.id_str
     
-    # Check if already shared
-    existing_share = repository.get_shared_chat_by_chat_id(chat_id, user_id)
-    if existing_share:
-        # Update existing share
-        updated_share = repository.update_shared_chat(chat_id, user_id, settings)
-        if not updated_share:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to update share settings"
-            )
-        
+    # Update the existing share if there is one; a share owned by the user
+    # already proves they own the chat, so no separate check is needed
+    updated_share = await asyncio.to_thread(repository.update_shared_chat, chat_id, user_id, settings)
+    if updated_share:
         # Generate share URL
         base_url = str(request.base_url).rstrip('/')
         share_url = f"{base_url}/shared/{updated_share.share_token}"
         
-        return ShareResponse(
-            share_token=updated_share.share_token,
-            share_url=share_url,
-            title=updated_share.title,
-            is_public=updated_share.is_public,
-            expires_at=updated_share.expires_at,
-            created_at=updated_share.created_at
+        return ORJSONResponse(content={
+            "share_token": updated_share.share_token,
+            "share_url": share_url,
+            "title": updated_share.title,
+            "is_public": updated_share.is_public,
+            "expires_at": updated_share.expires_at,
+            "created_at": updated_share.created_at
+        })
+    
+    # Verify the user owns this chat; non-owners get a 404 so existence isn't leaked
+    if not await asyncio.to_thread(repository.user_owns_chat, chat_id, user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat not found"
         )
     
     # Generate secure share token
     share_token = secrets.token_urlsafe(32)
     
     # Create new shared chat
-    shared_chat = repository.create_shared_chat(share_token, chat_id, user_id, settings)
+    shared_chat = await asyncio.to_thread(repository.create_shared_chat, share_token, chat_id, user_id, settings)
     
     # Generate share URL
     base_url = str(request.base_url).rstrip('/')
     share_url = f"{base_url}/shared/{share_token}"
     
-    return ShareResponse(
-        share_token=share_token,
-        share_url=share_url,
-        title=shared_chat.title,
-        is_public=shared_chat.is_public,
-        expires_at=shared_chat.expires_at,
-        created_at=shared_chat.created_at
-    )
+    return ORJSONResponse(content={
+        "share_token": share_token,
+        "share_url": share_url,
+        "title": shared_chat.title,
+        "is_public": shared_chat.is_public,
+        "expires_at": shared_chat.expires_at,
+        "created_at": shared_chat.created_at
+    })
 
 
 @router.get("/shared/{share_token}", response_model=SharedChatResponse)
 async def get_shared_chat(
     share_token: str,
-    session: Session = Depends(get_session)
+    repository: PersistenceRepository = Depends(get_repository)
 ):
     """
     Get a shared chat by its token.
     Public endpoint - no authentication required.
     """
-    repository = PersistenceRepository(session)
-    
     # Get shared chat info
-    shared_chat = repository.get_shared_chat_by_token(share_token)
+    shared_chat = await asyncio.to_thread(repository.get_shared_chat_by_token, share_token)
     if not shared_chat:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Shared chat not found or has expired"
         )
     
-    # Get chat messages
-    chat_messages = repository.get_chat_by_id(shared_chat.chat_id)
+    # Get chat messages, already filtered and sorted by the query
+    chat_messages = await asyncio.to_thread(repository.get_chat_messages, shared_chat.chat_id)
     if not chat_messages:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -674,48 +877,43 @@ async def get_shared_chat(
         )
     
     # Increment view count
-    repository.increment_view_count(share_token)
-    
-    # Format messages
-    formatted_messages = []
-    for msg in chat_messages:
-        if not msg.is_deleted:  # Only include non-deleted messages
-            formatted_messages.append({
-                "message_id": msg.message_id,
-                "question": msg.question,
-                "response": msg.response,
-                "timestamp": msg.msg_timestamp.isoformat(),
-                "mode": msg.mode.value,
-                "agents": msg.agents
-            })
-    
-    # Sort by timestamp
-    formatted_messages.sort(key=lambda x: x["timestamp"])
-    
-    return SharedChatResponse(
-        share_token=share_token,
-        chat_id=shared_chat.chat_id,
-        title=shared_chat.title,
-        description=shared_chat.description,
-        is_public=shared_chat.is_public,
-        view_count=shared_chat.view_count,
-        created_at=shared_chat.created_at,
-        messages=formatted_messages
-    )
+    await asyncio.to_thread(repository.increment_view_count, share_token)
+    
+    # Format messages; orjson serializes the timestamp and mode natively
+    formatted_messages = [
+        {
+            "message_id": msg.message_id,
+            "question": msg.question,
+            "response": msg.response,
+            "timestamp": msg.msg_timestamp,
+            "mode": msg.mode,
+            "agents": msg.agents
+        }
+        for msg in chat_messages
+    ]
+    
+    return ORJSONResponse(content={
+        "share_token": share_token,
+        "chat_id": shared_chat.chat_id,
+        "title": shared_chat.title,
+        "description": shared_chat.description,
+        "is_public": shared_chat.is_public,
+        "view_count": shared_chat.view_count,
+        "created_at": shared_chat.created_at,
+        "messages": formatted_messages
+    })
 
 
 @router.delete("/chat/{chat_id}/share")
 async def unshare_chat(
     chat_id: str,
-    session: Session = Depends(get_session),
+    repository: PersistenceRepository = Depends(get_repository),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     Remove sharing for a chat (make it private again).
     Only the chat owner can unshare their chat.
     """
-    repository = PersistenceRepository(session)
-    
     # Must be authenticated to unshare
     if not current_user:
         raise HTTPException(
@@ -723,26 +921,17 @@ async def unshare_chat(
             detail="Authentication required to unshare chats"
         )
     
-    user_id = str(current_user.id)
+    user_id = current_user.id_str
     
-    # Verify the user owns this chat
-    chat_messages = repository.get_chat_by_id(chat_id)
-    if not chat_messages:
+    # Verify the user owns this chat; non-owners get a 404 so existence isn't leaked
+    if not await asyncio.to_thread(repository.user_owns_chat, chat_id, user_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat not found"
         )
     
-    # Check if any message belongs to the user
-    user_owns_chat = any(msg.user_id == user_id for msg in chat_messages)
-    if not user_owns_chat:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only unshare your own chats"
-        )
-    
     # Delete the share
-    success = repository.delete_shared_chat(chat_id, user_id)
+    success = await asyncio.to_thread(repository.delete_shared_chat, chat_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -756,15 +945,13 @@ async def unshare_chat(
 async def get_chat_share_info(
     chat_id: str,
     request: Request,
-    session: Session = Depends(get_session),
+    repository: PersistenceRepository = Depends(get_repository),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     Get share information for a chat if it's currently shared.
     Only the chat owner can view share info.
     """
-    repository = PersistenceRepository(session)
-    
     # Must be authenticated
     if not current_user:
         raise HTTPException(
@@ -772,26 +959,17 @@ async def get_chat_share_info(
             detail="Authentication required"
         )
     
-    user_id = str(current_user.id)
+    user_id = current_user.id_str
     
-    # Verify the user owns this chat
-    chat_messages = repository.get_chat_by_id(chat_id)
-    if not chat_messages:
+    # Verify the user owns this chat; non-owners get a 404 so existence isn't leaked
+    if not await asyncio.to_thread(repository.user_owns_chat, chat_id, user_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat not found"
         )
     
-    # Check if any message belongs to the user
-    user_owns_chat = any(msg.user_id == user_id for msg in chat_messages)
-    if not user_owns_chat:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only view share info for your own chats"
-        )
-    
     # Get share info
-    shared_chat = repository.get_shared_chat_by_chat_id(chat_id, user_id)
+    shared_chat = await asyncio.to_thread(repository.get_shared_chat_by_chat_id, chat_id, user_id)
     if not shared_chat:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -802,11 +980,11 @@ async def get_chat_share_info(
     base_url = str(request.base_url).rstrip('/')
     share_url = f"{base_url}/shared/{shared_chat.share_token}"
     
-    return ShareResponse(
-        share_token=shared_chat.share_token,
-        share_url=share_url,
-        title=shared_chat.title,
-        is_public=shared_chat.is_public,
-        expires_at=shared_chat.expires_at,
-        created_at=shared_chat.created_at
-    )
\ No newline at end of file
+    return ORJSONResponse(content={
+        "share_token": shared_chat.share_token,
+        "share_url": share_url,
+        "title": shared_chat.title,
+        "is_public": shared_chat.is_public,
+        "expires_at": shared_chat.expires_at,
+        "created_at": shared_chat.created_at
+    })
\ No newline at end of file
@@ -59,7 +59,7 @@ def get_user_identifier(current_user, request: Request, response: Response) -> s
     """
     if current_user:
         # Store actual user ID as string for authenticated users
-        return str(current_user.id)
+        return current_user.id_str
     else:
         # Store anonymous session ID for non-authenticated users
         return get_or_create_anonymous_session(request, response)
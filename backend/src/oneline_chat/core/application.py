@@ -4,14 +4,17 @@ This module provides the single source of truth for the application instance and
 """
 
 from typing import Optional
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 import os
+import orjson
 from datetime import datetime
 
 from .config import Settings
 from .logging import setup_logging, get_logger
+from .responses import ORJSONResponse
 
 
 class Application:
@@ -102,6 +105,8 @@ class Application:
     
     async def _on_shutdown(self):
         """Execute shutdown tasks."""
+        from ..services import close_ai_client
+        await close_ai_client()
         self.logger.info("Application shutdown complete")
     
     def _create_app(self) -> FastAPI:
@@ -112,6 +117,7 @@ class Application:
             version=self.settings.app.version,
             docs_url="/docs",
             redoc_url="/redoc",
+            default_response_class=ORJSONResponse,
             lifespan=self.lifespan
         )
         
@@ -124,6 +130,10 @@ class Application:
             allow_headers=["*"],
         )
         
+        # Compress larger JSON bodies such as long chat histories; Starlette
+        # 0.46+ (the pyproject floor) leaves text/event-stream uncompressed
+        app.add_middleware(GZipMiddleware, minimum_size=1024)
+        
         # Register routes
         self._register_routes(app)
         
@@ -138,41 +148,50 @@ class Application:
         app.include_router(auth_router)
         app.include_router(chat_router)
         
-        # Root endpoint
+        # Root endpoint - static payload, serialized once
+        root_body = orjson.dumps({
+            "message": self.settings.app.title,
+            "version": self.settings.app.version,
+            "docs": "/docs",
+            "endpoints": {
+                "auth": {
+                    "register": "/api/v1/auth/register",
+                    "login": "/api/v1/auth/login",
+                    "logout": "/api/v1/auth/logout",
+                    "profile": "/api/v1/auth/me"
+                },
+                "chat": {
+                    "completion": "/api/v1/chat/completions",
+                    "stream": "/api/v1/chat/stream",
+                    "history": "/api/v1/chat/history/{chat_id}",
+                    "models": "/api/v1/models"
+                }
+            }
+        })
+        
         @app.get("/")
         async def root():
             """Root endpoint."""
-            return {
-                "message": self.settings.app.title,
-                "version": self.settings.app.version,
-                "docs": "/docs",
-                "endpoints": {
-                    "auth": {
-                        "register": "/api/v1/auth/register",
-                        "login": "/api/v1/auth/login",
-                        "logout": "/api/v1/auth/logout",
-                        "profile": "/api/v1/auth/me"
-                    },
-                    "chat": {
-                        "completion": "/api/v1/chat/completions",
-                        "stream": "/api/v1/chat/stream",
-                        "history": "/api/v1/chat/history/{chat_id}",
-                        "models": "/api/v1/models"
-                    }
-                }
-            }
+            return Response(content=root_body, media_type="application/json")
+        
+        # Health check endpoint - only the timestamp changes between probes
+        health_static = {
+            "environment": self.settings.app.environment,
+            "database": "connected",
+            "ai_provider": self.settings.ai.provider
+        }
         
-        # Health check endpoint
         @app.get("/health")
         async def health_check():
             """Health check endpoint."""
-            return {
-                "status": "healthy",
-                "timestamp": datetime.utcnow().isoformat(),
-                "environment": self.settings.app.environment,
-                "database": "connected",
-                "ai_provider": self.settings.ai.provider
-            }
+            return Response(
+                content=orjson.dumps({
+                    "status": "healthy",
+                    "timestamp": datetime.utcnow(),
+                    **health_static
+                }),
+                media_type="application/json"
+            )
     
     @property
     def app(self) -> FastAPI:
@@ -2,7 +2,10 @@
 Authentication utilities for password hashing and token management.
 """
 
+import asyncio
+import os
 import secrets
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
@@ -30,6 +33,12 @@ auth_settings = AuthSettings()
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Bounded pool for CPU-bound bcrypt work so it never runs on the event loop
+_PWD_EXECUTOR = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1,
+    thread_name_prefix="pwd-hash"
+)
+
 
 def hash_password(password: str) -> str:
     """
@@ -58,6 +67,37 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password on the password thread pool.
+    
+    Args:
+        password: Plain text password
+        
+    Returns:
+        Hashed password string
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_PWD_EXECUTOR, hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password against its hash on the password thread pool.
+    
+    Args:
+        plain_password: Plain text password to verify
+        hashed_password: Hashed password to compare against
+        
+    Returns:
+        True if password matches, False otherwise
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _PWD_EXECUTOR, verify_password, plain_password, hashed_password
+    )
+
+
 def generate_session_token() -> str:
     """
     Generate a secure random session token.
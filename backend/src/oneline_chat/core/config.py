@@ -64,6 +64,14 @@ class AppSettings(BaseSettings):
     port: int = Field(default=8000, env="APP_PORT")
     reload: bool = Field(default=True, env="APP_RELOAD")
     
+    # Server tuning
+    workers: int = Field(default=1, env="APP_WORKERS")
+    # Per-worker connection cap; open SSE streams count against it
+    limit_concurrency: Optional[int] = Field(default=None, env="APP_LIMIT_CONCURRENCY")
+    backlog: int = Field(default=2048, env="APP_BACKLOG")
+    timeout_keep_alive: int = Field(default=30, env="APP_TIMEOUT_KEEP_ALIVE")
+    access_log: bool = Field(default=True, env="APP_ACCESS_LOG")
+    
     environment: Literal["development", "staging", "production"] = Field(
         default="development", env="APP_ENV"
     )
@@ -37,6 +37,12 @@ class User(SQLModel, table=True):
     
     # Relationships
     sessions: List["UserSession"] = Relationship(back_populates="user")
+    
+    @property
+    def id_str(self) -> str:
+        """User ID as stored in string user_id columns such as oneline_chat.user_id."""
+        # Not cached: a read before the row is flushed would pin "None"
+        return str(self.id)
 
 
 class UserSession(SQLModel, table=True):
@@ -2,8 +2,8 @@
 Database repository for Oneline Chat data persistence.
 """
 
-from sqlmodel import Session, select
-from typing import List, Optional
+from sqlmodel import Session, select, func, update
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
 from .models import OnelineChat, AgentMarketplace, AgentAccess, ModeEnum, AgentCommunicationProtocol, User, UserSession, ChatSummary, ChatHistoryResponse, SharedChat, ShareSettings, ShareResponse, SharedChatResponse
@@ -14,6 +14,9 @@ class PersistenceRepository:
     
     def __init__(self, session: Session):
         self.session = session
+        # Ownership results, memoized for the lifetime of the repository
+        # (one request when created through the router dependency)
+        self._owned_chats: Dict[Tuple[str, str], bool] = {}
     
     # OnelineChat operations
     def create_chat(
@@ -52,15 +55,38 @@ class PersistenceRepository:
         self.session.refresh(chat)
         return chat
     
-    def get_chat_by_id(self, chat_id: str) -> List[OnelineChat]:
-        """Get all messages for a specific chat session."""
+    def get_chat_by_id(self, chat_id: str, user_id: Optional[str] = None) -> List[OnelineChat]:
+        """Get all messages for a specific chat session, optionally restricted to a user."""
         statement = select(OnelineChat).where(OnelineChat.chat_id == chat_id)
+        if user_id is not None:
+            statement = statement.where(OnelineChat.user_id == user_id)
+        results = self.session.exec(statement)
+        return results.all()
+    
+    def user_owns_chat(self, chat_id: str, user_id: str) -> bool:
+        """Check whether any message of a chat session belongs to the user."""
+        key = (chat_id, user_id)
+        owned = self._owned_chats.get(key)
+        if owned is None:
+            statement = select(OnelineChat.id).where(
+                OnelineChat.chat_id == chat_id,
+                OnelineChat.user_id == user_id
+            ).limit(1)
+            owned = self._owned_chats[key] = self.session.exec(statement).first() is not None
+        return owned
+    
+    def get_chat_messages(self, chat_id: str) -> List[OnelineChat]:
+        """Get the non-deleted messages of a chat session, oldest first."""
+        statement = select(OnelineChat).where(
+            OnelineChat.chat_id == chat_id,
+            OnelineChat.is_deleted == False
+        ).order_by(OnelineChat.msg_timestamp.asc())
         results = self.session.exec(statement)
         return results.all()
     
     def get_chat_by_message_id(self, message_id: str) -> Optional[OnelineChat]:
         """Get a specific message by its ID."""
-        statement = select(OnelineChat).where(OnelineChat.message_id == message_id)
+        statement = select(OnelineChat).where(OnelineChat.message_id == message_id).limit(1)
         results = self.session.exec(statement)
         return results.first()
     
@@ -84,7 +110,7 @@ class PersistenceRepository:
     
     def get_agent_by_name(self, agent_name: str) -> Optional[AgentMarketplace]:
         """Get an agent by its name."""
-        statement = select(AgentMarketplace).where(AgentMarketplace.agent_name == agent_name)
+        statement = select(AgentMarketplace).where(AgentMarketplace.agent_name == agent_name).limit(1)
         results = self.session.exec(statement)
         return results.first()
     
@@ -113,8 +139,7 @@ class PersistenceRepository:
         
         agents = []
         for access in accesses:
-            agent_statement = select(AgentMarketplace).where(AgentMarketplace.id == access.agent_id)
-            agent = self.session.exec(agent_statement).first()
+            agent = self.session.get(AgentMarketplace, access.agent_id)
             if agent:
                 agents.append(agent)
         return agents
@@ -124,7 +149,7 @@ class PersistenceRepository:
         statement = select(AgentAccess).where(
             AgentAccess.username == username,
             AgentAccess.agent_id == agent_id
-        )
+        ).limit(1)
         result = self.session.exec(statement).first()
         return result is not None
     
@@ -133,7 +158,7 @@ class PersistenceRepository:
         statement = select(AgentAccess).where(
             AgentAccess.username == username,
             AgentAccess.agent_id == agent_id
-        )
+        ).limit(1)
         access = self.session.exec(statement).first()
         if access:
             self.session.delete(access)
@@ -192,11 +217,11 @@ class PersistenceRepository:
             
             if latest_message:
                 # Count messages in this chat
-                count_query = select(OnelineChat).where(
+                count_query = select(func.count(OnelineChat.id)).where(
                     OnelineChat.chat_id == chat_id,
                     OnelineChat.is_deleted == False
                 )
-                message_count = len(self.session.exec(count_query).all())
+                message_count = self.session.exec(count_query).one()
                 
                 # Get model used from agents data
                 model_used = None
@@ -330,14 +355,14 @@ class PersistenceRepository:
             return None
         
         # Count messages in this chat
-        count_query = select(OnelineChat).where(
+        count_query = select(func.count(OnelineChat.id)).where(
             OnelineChat.chat_id == chat_id,
             OnelineChat.is_deleted == False
         )
         if user_id:
             count_query = count_query.where(OnelineChat.user_id == user_id)
         
-        message_count = len(self.session.exec(count_query).all())
+        message_count = self.session.exec(count_query).one()
         
         # Get model used from agents data
         model_used = None
@@ -404,7 +429,7 @@ class PersistenceRepository:
         statement = select(SharedChat).where(
             SharedChat.chat_id == chat_id,
             SharedChat.owner_id == owner_id
-        )
+        ).limit(1)
         result = self.session.exec(statement)
         return result.first()
     
@@ -425,7 +450,7 @@ class PersistenceRepository:
         statement = select(SharedChat).where(
             SharedChat.chat_id == chat_id,
             SharedChat.owner_id == owner_id
-        )
+        ).limit(1)
         shared_chat = self.session.exec(statement).first()
         if shared_chat:
             self.session.delete(shared_chat)
@@ -443,7 +468,7 @@ class PersistenceRepository:
         statement = select(SharedChat).where(
             SharedChat.chat_id == chat_id,
             SharedChat.owner_id == owner_id
-        )
+        ).limit(1)
         shared_chat = self.session.exec(statement).first()
         if shared_chat:
             shared_chat.title = settings.title
@@ -497,16 +522,39 @@ class UserRepository:
         results = self.session.exec(statement)
         return results.first()
     
-    async def get_user_by_id(self, user_id: int) -> Optional[User]:
-        """Get a user by ID."""
-        statement = select(User).where(User.id == user_id)
+    async def get_user_by_identity(self, identifier: str) -> Optional[User]:
+        """
+        Get a user whose username or email matches the identifier in a single query.
+        
+        An exact username match wins over an email match, so the result is
+        deterministic when one user's username equals another user's email.
+        """
+        statement = (
+            select(User)
+            .where((User.username == identifier) | (User.email == identifier))
+            .order_by((User.username == identifier).desc())
+            .limit(1)
+        )
         results = self.session.exec(statement)
         return results.first()
     
+    async def check_username_or_email_taken(self, username: str, email: str) -> Tuple[bool, bool]:
+        """Check whether a username or email is already registered in a single query."""
+        statement = select(User.username, User.email).where(
+            (User.username == username) | (User.email == email)
+        )
+        rows = self.session.exec(statement).all()
+        username_taken = any(row.username == username for row in rows)
+        email_taken = any(row.email == email for row in rows)
+        return username_taken, email_taken
+    
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        """Get a user by ID."""
+        return self.session.get(User, user_id)
+    
     async def update_last_login(self, user_id: int) -> bool:
         """Update user's last login timestamp."""
-        statement = select(User).where(User.id == user_id)
-        user = self.session.exec(statement).first()
+        user = self.session.get(User, user_id)
         if user:
             user.last_login = datetime.utcnow()
             self.session.add(user)
@@ -516,8 +564,7 @@ class UserRepository:
     
     async def update_user(self, user_id: int, **kwargs) -> Optional[User]:
         """Update user profile information."""
-        statement = select(User).where(User.id == user_id)
-        user = self.session.exec(statement).first()
+        user = self.session.get(User, user_id)
         if user:
             for key, value in kwargs.items():
                 if hasattr(user, key):
@@ -551,6 +598,30 @@ class UserRepository:
         self.session.refresh(session)
         return session
     
+    async def create_session_and_touch_login(
+        self,
+        user_id: int,
+        session_token: str,
+        expires_at: datetime,
+        user_agent: Optional[str] = None,
+        ip_address: Optional[str] = None
+    ) -> datetime:
+        """Create a user session and update last login in one transaction."""
+        now = datetime.utcnow()
+        self.session.add(UserSession(
+            session_token=session_token,
+            user_id=user_id,
+            expires_at=expires_at,
+            created_at=now,
+            user_agent=user_agent,
+            ip_address=ip_address
+        ))
+        self.session.exec(
+            update(User).where(User.id == user_id).values(last_login=now)
+        )
+        self.session.commit()
+        return now
+    
     async def get_session(self, token: str) -> Optional[UserSession]:
         """Get a session by token."""
         statement = select(UserSession).where(
@@ -560,6 +631,20 @@ class UserRepository:
         results = self.session.exec(statement)
         return results.first()
     
+    async def get_active_user_by_token(self, token: str) -> Optional[Tuple[User, UserSession]]:
+        """Get an active user and their unexpired session by token in a single query."""
+        statement = (
+            select(User, UserSession)
+            .join(UserSession, UserSession.user_id == User.id)
+            .where(
+                UserSession.session_token == token,
+                UserSession.expires_at > datetime.utcnow(),
+                User.is_active == True
+            )
+        )
+        results = self.session.exec(statement)
+        return results.first()
+    
     async def delete_session(self, token: str) -> bool:
         """Delete a session (logout)."""
         statement = select(UserSession).where(UserSession.session_token == token)
@@ -10,12 +10,19 @@ def main():
     """Main entry point for the application."""
     settings = application.get_settings()
     
-    # Start the application
+    reload = settings.app.reload and settings.app.is_development
+    
+    # Start the application (uvicorn[standard] picks uvloop and httptools)
     uvicorn.run(
         "oneline_chat.app:app",
         host=settings.app.host,
         port=settings.app.port,
-        reload=settings.app.reload and settings.app.is_development,
+        reload=reload,
+        workers=None if reload else settings.app.workers,
+        limit_concurrency=settings.app.limit_concurrency,
+        backlog=settings.app.backlog,
+        timeout_keep_alive=settings.app.timeout_keep_alive,
+        access_log=settings.app.access_log,
         log_level=settings.app.log_level.lower()
     )
 
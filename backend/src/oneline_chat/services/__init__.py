@@ -2,6 +2,7 @@
 
 from .ai_client import (
     get_ai_client,
+    close_ai_client,
     get_default_model,
     get_ai_provider,
     is_ollama_provider,
@@ -11,6 +12,7 @@ from .ai_client import (
 
 __all__ = [
     "get_ai_client",
+    "close_ai_client",
     "get_default_model", 
     "get_ai_provider",
     "is_ollama_provider",
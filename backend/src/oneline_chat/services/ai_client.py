@@ -2,7 +2,10 @@
 AI Client configuration for OpenAI and Ollama support.
 """
 
-from openai import AsyncOpenAI
+import functools
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 from ..core.logging import get_logger
 
@@ -11,6 +14,14 @@ logger = get_logger(__name__)
 # Global client instance
 client = None
 
+# Connection pool limits for outbound AI provider requests
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """Create the pooled HTTP client shared by all AI provider calls."""
+    return DefaultAsyncHttpxClient(limits=HTTP_POOL_LIMITS)
+
 
 def get_ai_client() -> AsyncOpenAI:
     """
@@ -28,6 +39,7 @@ def get_ai_client() -> AsyncOpenAI:
         client = AsyncOpenAI(
             base_url=settings.ai.ollama_base_url,
             api_key=settings.ai.ollama_api_key,
+            http_client=_create_http_client(),
         )
         return client
     
@@ -38,17 +50,29 @@ def get_ai_client() -> AsyncOpenAI:
         
         logger.info("Initializing OpenAI client")
         
-        client = AsyncOpenAI(api_key=settings.ai.openai_api_key)
+        client = AsyncOpenAI(
+            api_key=settings.ai.openai_api_key,
+            http_client=_create_http_client(),
+        )
         return client
     
     else:
         raise ValueError(f"Unsupported AI_PROVIDER: {settings.ai.provider}. Use 'openai' or 'ollama'")
 
 
+async def close_ai_client() -> None:
+    """Close the AI client and release its pooled connections."""
+    if client is not None:
+        await client.close()
+
+
+@functools.cache
 def get_default_model() -> str:
     """
     Get default model name based on AI provider.
     
+    Settings are loaded once at startup, so the result is cached.
+    
     Returns:
         str: Default model name
     """
@@ -56,10 +80,13 @@ def get_default_model() -> str:
     return settings.ai.default_model
 
 
+@functools.cache
 def get_ai_provider() -> str:
     """
     Get current AI provider.
     
+    Settings are loaded once at startup, so the result is cached.
+    
     Returns:
         str: Current AI provider ('openai' or 'ollama')
     """